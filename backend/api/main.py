@@ -1,25 +1,62 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import Depends, FastAPI, File, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from pydantic import BaseModel
-from typing import List
+from typing import TYPE_CHECKING, Callable, Dict, List, Literal, Optional, Tuple
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import scipy.optimize as spo
+import asyncio
+import base64
+import io
+import logging
 import os
-import pandas_datareader as pdr
+import re
+import tempfile
+import threading
+import httpx
+import msgspec
+import orjson
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
 from ml_model.rf_features import fft_features, train_rf_model, fetch_stock_data, train_stock_model
+from ml_model._jit import njit, portfolio_stats, weighted_returns
 from quantum.qaoa_optimizer import solve_qaoa
-from quantum.qaoa_optimizer import get_qaoa_state_preview
+from utils.cache import cached_call, content_key, parquet_cache_path, read_fresh_parquet, write_parquet_atomic
+from utils.http import SESSION
+from cachetools import LRUCache, TTLCache
 from dotenv import load_dotenv
 from pathlib import Path
 
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
 # Load environment variables from .env file in backend directory
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
-app = FastAPI(title="QRPO Backend", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+STOOQ_CSV_URL = "https://stooq.com/q/d/l/"
+STOOQ_MAX_CONCURRENCY = 8  # Concurrent Stooq downloads per portfolio request
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP client for the whole process so upstream connections are kept alive
+    app.state.http = httpx.AsyncClient(timeout=30)
+    _PLOT_DIR.mkdir(parents=True, exist_ok=True)
+    # Page in SLSQP's Fortran routines and scipy.fft's pocketfft backend (plus its plan cache
+    # for the ~64-point portfolio spectrum) so the first real request doesn't pay for them
+    spo.minimize(lambda x: x[0] ** 2, [1.0], method="SLSQP")
+    fft_features(np.arange(64, dtype=np.float64))
+    yield
+    await app.state.http.aclose()
+
+# orjson serializes NumPy arrays straight from their buffers; endpoints that return arrays
+# wrap them in ORJSONResponse themselves so FastAPI's jsonable_encoder is skipped
+app = FastAPI(title="QRPO Backend", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,18 +69,36 @@ app.add_middleware(
 
 class FFTRequest(BaseModel):
     series: List[float]
-
-class ClassicalOptRequest(BaseModel):
+    # "base64" returns the magnitudes as a packed little-endian float32 buffer instead of a list
+    encoding: Literal["json", "base64"] = "json"
+    # Approximate (sqrt-free) magnitudes; plenty for plotting, total_energy stays exact
+    fast_magnitude: bool = False
+
+# The optimizer payloads carry an n x n matrix, so they are decoded with msgspec's C decoder
+# instead of letting Pydantic validate every cell
+class ClassicalOptRequest(msgspec.Struct):
     mu: List[float]
     cov: List[List[float]]
     lam: float = 0.5
 
-class QuantumOptRequest(BaseModel):
+class QuantumOptRequest(msgspec.Struct):
     mu: List[float]
     cov: List[List[float]]
     lam: float = 0.5
     reps: int = 1
 
+_CLASSICAL_OPT_DECODER = msgspec.json.Decoder(ClassicalOptRequest)
+_QUANTUM_OPT_DECODER = msgspec.json.Decoder(QuantumOptRequest)
+
+def _msgspec_openapi_body(struct_type: type) -> dict:
+    """OpenAPI requestBody for a route that reads the raw Request and decodes it with msgspec,
+    so /docs still documents the payload FastAPI itself never sees."""
+    _, components = msgspec.json.schema_components([struct_type], ref_template="#/components/schemas/{name}")
+    return {
+        "required": True,
+        "content": {"application/json": {"schema": components[struct_type.__name__]}},
+    }
+
 class StockAnalysisRequest(BaseModel):
     ticker: str = "SPY"
     period: str = "1mo"
@@ -55,31 +110,161 @@ def health():
 @app.post("/features/fft")
 def features_fft(req: FFTRequest):
     data = np.array(req.series, dtype=float)
-    res = fft_features(data)
-    return res
-
-@app.post("/optimize/classical")
-def optimize_classical(req: ClassicalOptRequest):
-    import scipy.optimize as spo
-    mu = np.array(req.mu, dtype=float)
-    cov = np.array(req.cov, dtype=float)
+    result = fft_features(data, fast_magnitude=req.fast_magnitude)
+    if req.encoding == "base64":
+        # Half the bytes of float64 and no per-bin JSON numbers; bin k is at frequency k * freq_step
+        mag = result["magnitude"].astype("<f4")
+        return ORJSONResponse({
+            "magnitude_b64": base64.b64encode(mag.tobytes()).decode("ascii"),
+            "n_bins": int(mag.size),
+            "freq_step": float(result["freqs"][1]),
+            "stats": result["stats"],
+        })
+    return ORJSONResponse(result)
+
+def _as_qp_arrays(mu: List[float], cov: List[List[float]]):
+    """Materialize (mu, cov) once as C-contiguous float64 arrays and check their shapes.
+
+    cov is returned symmetrized: w'Cw only depends on (C + C')/2, and the analytic gradient
+    2*C*w used by every solver below is only correct for a symmetric C.
+    """
+    mu_arr = np.asarray(mu, dtype=np.float64)
+    cov_arr = np.asarray(cov, dtype=np.float64, order="C")
+    n = mu_arr.shape[0]
+    if cov_arr.shape != (n, n):
+        raise ValueError(f"cov must be {n}x{n} to match mu, got shape {cov_arr.shape}")
+    cov_arr = np.ascontiguousarray(0.5 * (cov_arr + cov_arr.T))
+    return mu_arr, cov_arr
+
+@njit("Tuple((f8, f8[::1]))(f8[::1], f8[:, ::1], f8[::1], f8)", cache=True, fastmath=True)
+def _qp_obj_grad(w, cov, mu, lam):
+    """Mean-variance objective w'Cw - lam*mu'w and its analytic gradient (C symmetric) in one call."""
+    cw = cov @ w
+    return w @ cw - lam * (mu @ w), 2.0 * cw - lam * mu
+
+@njit("f8[::1](f8[::1])", cache=True, fastmath=True)
+def _project_simplex(v):
+    """Euclidean projection onto {w : sum(w) = 1, w >= 0} (Duchi et al., 2008)."""
+    u = np.sort(v)[::-1]
+    css = np.cumsum(u)
+    rho = 0
+    for j in range(u.size):
+        if u[j] - (css[j] - 1.0) / (j + 1) > 0.0:
+            rho = j
+    theta = (css[rho] - 1.0) / (rho + 1)
+    return np.maximum(v - theta, 0.0)
+
+@njit("Tuple((f8[::1], i8, b1))(f8[:, ::1], f8[::1], f8, f8, i8, f8)", cache=True, fastmath=True)
+def _qp_simplex_pg(cov2, mu, lam, step, max_iter, tol):
+    """Accelerated projected gradient (FISTA) for min w'Cw - lam*mu'w on the simplex.
+
+    Takes the precomputed Hessian 2*C, which must be symmetric (the gradient is 2*C*w - lam*mu;
+    _as_qp_arrays guarantees this); returns (weights, iterations, converged).
+    """
+    n = mu.size
+    lmu = lam * mu
+    w = np.full(n, 1.0 / n)
+    y = w.copy()
+    t = 1.0
+    for k in range(max_iter):
+        w_next = _project_simplex(y - step * (cov2 @ y - lmu))
+        if np.max(np.abs(w_next - w)) < tol:
+            # Momentum can stall away from the optimum; confirm with the fixed-point residual
+            r = w_next - _project_simplex(w_next - step * (cov2 @ w_next - lmu))
+            if np.max(np.abs(r)) < tol:
+                return w_next, k + 1, True
+            w = w_next
+            y = w_next.copy()
+            t = 1.0
+            continue
+        t_next = 0.5 * (1.0 + np.sqrt(1.0 + 4.0 * t * t))
+        y = w_next + ((t - 1.0) / t_next) * (w_next - w)
+        w = w_next
+        t = t_next
+    return w, max_iter, False
+
+def _kkt_polish(cov: np.ndarray, mu: np.ndarray, lam: float, w: np.ndarray, tol: float = 1e-9) -> Optional[np.ndarray]:
+    """Solve the KKT system exactly on the support of an approximate simplex-QP solution.
+
+    With the active set fixed, min w'Cw - lam*mu'w s.t. sum(w) = 1 is an equality-constrained QP
+    whose optimum solves [2C_SS 1; 1' 0] [w_S; nu] = [lam*mu_S; 1] (C symmetric, as for the
+    projected-gradient solve). Returns the polished weights if they are primal and dual
+    feasible, otherwise None (keep the iterative solution).
+    """
+    support = np.flatnonzero(w > tol)
+    k = support.size
+    if k == 0:
+        return None
+    kkt = np.zeros((k + 1, k + 1))
+    kkt[:k, :k] = 2.0 * cov[np.ix_(support, support)]
+    kkt[:k, k] = kkt[k, :k] = 1.0
+    rhs = np.append(lam * mu[support], 1.0)
+    try:
+        sol = np.linalg.solve(kkt, rhs)
+    except np.linalg.LinAlgError:
+        return None
+    w_s, level = sol[:k], -sol[k]  # level = common gradient value on the support
+    if w_s.min() < -tol:
+        return None
+    polished = np.zeros_like(w)
+    polished[support] = np.maximum(w_s, 0.0)
+    # Dual feasibility: no off-support gradient entry may sit below the support's level
+    grad = 2.0 * (cov @ polished) - lam * mu
+    if np.delete(grad, support).min(initial=np.inf) < level - tol * max(1.0, abs(level)):
+        return None
+    return polished
+
+@app.post("/optimize/classical", openapi_extra={"requestBody": _msgspec_openapi_body(ClassicalOptRequest)})
+async def optimize_classical(request: Request):
+    try:
+        req = _CLASSICAL_OPT_DECODER.decode(await request.body())
+    except msgspec.MsgspecError as e:
+        return ORJSONResponse({"error": str(e)}, status_code=422)
+    return await run_in_threadpool(_optimize_classical, req)
+
+def _optimize_classical(req: ClassicalOptRequest):
+    try:
+        mu, cov = _as_qp_arrays(req.mu, req.cov)
+    except ValueError as e:
+        return ORJSONResponse({"error": str(e)}, status_code=400)
     lam = float(req.lam)
     n = len(mu)
-    w0 = np.ones(n) / n
-
-    def objective(w):
-        return float(w @ cov @ w - lam * (mu @ w))
 
-    cons = ({"type": "eq", "fun": lambda w: np.sum(w) - 1.0},)
+    # Projected gradient with step 1/L, L = Lipschitz constant of the gradient 2*C
+    cov2 = 2.0 * cov
+    lipschitz = float(np.linalg.norm(cov2, 2))
+    step = 1.0 / lipschitz if lipschitz > 0.0 else 1.0
+    # A loose solve is enough to identify the optimal support; the KKT solve on that support then
+    # gives the exact optimum. If the KKT check fails we grind projected gradient down to 1e-10.
+    w, iters, converged = _qp_simplex_pg(cov2, mu, lam, step, 10_000, 1e-6)
+    polished = _kkt_polish(cov, mu, lam, w) if converged else None
+    if polished is not None:
+        w = polished
+    elif converged:
+        w, iters, converged = _qp_simplex_pg(cov2, mu, lam, step, 10_000, 1e-10)
+    if converged:
+        obj, _ = _qp_obj_grad(w, cov, mu, lam)
+        return ORJSONResponse({"weights": w, "objective": float(obj), "success": True,
+                               "message": f"Projected gradient converged in {iters} iterations"})
+
+    # Fall back to SLSQP when projected gradient stalls (e.g. indefinite covariance)
+    w0 = np.full(n, 1.0 / n)
+    cons = ({"type": "eq", "fun": lambda w: np.sum(w) - 1.0, "jac": lambda w: np.ones_like(w)},)
     bounds = [(0.0, 1.0)] * n
-    res = spo.minimize(objective, w0, method="SLSQP", bounds=bounds, constraints=cons)
-    return {"weights": res.x.tolist(), "objective": float(objective(res.x)), "success": bool(res.success), "message": res.message}
+    res = spo.minimize(_qp_obj_grad, w0, args=(cov, mu, lam), jac=True, method="SLSQP", bounds=bounds, constraints=cons)
+    return ORJSONResponse({"weights": res.x, "objective": float(res.fun), "success": bool(res.success), "message": res.message})
 
-@app.post("/optimize/quantum")
-def optimize_quantum(req: QuantumOptRequest):
+@app.post("/optimize/quantum", openapi_extra={"requestBody": _msgspec_openapi_body(QuantumOptRequest)})
+async def optimize_quantum(request: Request):
     try:
-        mu = np.array(req.mu, dtype=float)
-        cov = np.array(req.cov, dtype=float)
+        req = _QUANTUM_OPT_DECODER.decode(await request.body())
+    except msgspec.MsgspecError as e:
+        return ORJSONResponse({"error": str(e)}, status_code=422)
+    return await run_in_threadpool(_optimize_quantum, req)
+
+def _optimize_quantum(req: QuantumOptRequest):
+    try:
+        mu, cov = _as_qp_arrays(req.mu, req.cov)
         lam = float(req.lam)
         reps = int(req.reps)
         bits, fval = solve_qaoa(cov, mu, risk_aversion=lam, reps=reps)
@@ -87,10 +272,108 @@ def optimize_quantum(req: QuantumOptRequest):
     except Exception as e:
         return {"error": str(e), "type": type(e).__name__}
 
+# Plots are encoded as lossy WebP by default: libwebp encodes several times faster than
+# zlib-based PNG and produces smaller files for these charts. PLOT_FORMAT=svg skips
+# rasterization entirely and ships vector output that stays sharp at any client zoom.
+# Each format maps to (media type, savefig kwargs, rcParams). For SVG, the Date metadata is
+# dropped and the hash salt for element ids is fixed (matplotlib salts them randomly), so
+# identical plots produce identical bytes.
+_PLOT_FORMATS = {
+    "webp": ("image/webp", {"dpi": 100, "pil_kwargs": {"quality": 85, "method": 4}}, {}),
+    "svg": ("image/svg+xml", {"metadata": {"Date": None}}, {"svg.hashsalt": "qrpo"}),
+}
+PLOT_FORMAT = os.getenv("PLOT_FORMAT", "webp").lower()
+if PLOT_FORMAT not in _PLOT_FORMATS:
+    raise ValueError(f"PLOT_FORMAT must be one of {sorted(_PLOT_FORMATS)}, got {PLOT_FORMAT!r}")
+PLOT_MEDIA_TYPE, _format_kwargs, _PLOT_RC_PARAMS = _PLOT_FORMATS[PLOT_FORMAT]
+_PLOT_SAVE_KWARGS = {"format": PLOT_FORMAT, "bbox_inches": "tight", **_format_kwargs}
+
+# Latest plots are also published next to the model code, resolved from this file rather than
+# the process working directory (which differs under uvicorn/systemd/docker)
+_PLOT_DIR = Path(__file__).resolve().parent.parent / "ml_model"
+_RF_PLOT_PATH = str(_PLOT_DIR / f"rf_plot.{PLOT_FORMAT}")
+_STOCK_PLOT_PATH = str(_PLOT_DIR / f"stock_plot.{PLOT_FORMAT}")
+
+# Rendered plot images keyed by a content hash of the plotted data
+_PLOT_CACHE: LRUCache = LRUCache(maxsize=256)
+_PLOT_CACHE_LOCK = threading.Lock()
+
+def _cached_plot(key: str, render: Callable[[], bytes]) -> bytes:
+    """Return the image for key, calling render() to draw it only on a cache miss."""
+    return cached_call(_PLOT_CACHE, _PLOT_CACHE_LOCK, key, render)
+
+def _publish_plot(image: bytes, plot_path: str) -> None:
+    """Atomically replace the latest plot on disk so readers never see a half-written file."""
+    tmp_path = f"{plot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(image)
+    os.replace(tmp_path, plot_path)
+
+def _plot_response(key: Optional[str], plot_path: str):
+    """Serve a cached plot by key, falling back to the latest plot written to disk."""
+    if key is not None:
+        with _PLOT_CACHE_LOCK:
+            image = _PLOT_CACHE.get(key)
+        if image is not None:
+            return Response(content=image, media_type=PLOT_MEDIA_TYPE)
+    return FileResponse(plot_path, media_type=PLOT_MEDIA_TYPE)
+
+# Plots use matplotlib's object-oriented API with a per-figure Agg canvas rather than pyplot,
+# whose global figure registry is not thread-safe under concurrent requests. Figures are pooled
+# per size and cleared between renders, so a cache miss reuses an existing figure and canvas.
+_FIGURE_POOL_SIZE = 4  # Idle figures kept per figsize
+_FIGURE_POOL: Dict[Tuple[float, float], List["Figure"]] = {}
+_FIGURE_POOL_LOCK = threading.Lock()
+
+@contextmanager
+def _pooled_figure(figsize: Tuple[float, float]):
+    """Borrow a blank Figure (with Agg canvas) of the given size, returning it to the pool after."""
+    with _FIGURE_POOL_LOCK:
+        idle = _FIGURE_POOL.setdefault(figsize, [])
+        fig = idle.pop() if idle else None
+    if fig is None:
+        # matplotlib (and its font cache) is only imported once a plot is actually drawn
+        import matplotlib
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        # Set process-wide rather than per save: rc_context swaps global state and would race
+        # between concurrent renders on the threadpool
+        matplotlib.rcParams.update(_PLOT_RC_PARAMS)
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    try:
+        yield fig
+    finally:
+        fig.clear()
+        with _FIGURE_POOL_LOCK:
+            if len(idle) < _FIGURE_POOL_SIZE:
+                idle.append(fig)
+
+def _render_rf_plot(df: pd.DataFrame) -> bytes:
+    with _pooled_figure((10, 6)) as fig:
+        return _draw_rf_plot(fig, df)
+
+def _draw_rf_plot(fig: "Figure", df: pd.DataFrame) -> bytes:
+    ax = fig.subplots()
+    ax.scatter(df["freq_MHz"], df["efficiency"], color="blue", alpha=0.6, s=50)
+    ax.set_xlabel("Frequency (MHz)")
+    ax.set_ylabel("Efficiency (%)")
+    ax.set_title("RF Efficiency Prediction")
+    ax.grid(True, alpha=0.3)
+    buf = io.BytesIO()
+    fig.savefig(buf, **_PLOT_SAVE_KWARGS)
+    return buf.getvalue()
+
 @app.post("/rf_efficiency")
 async def rf_efficiency(file: UploadFile = File(...)):
-    df = pd.read_csv(file.file)
-
+    # Receive the upload without blocking the event loop, then parse it on a worker thread
+    # with PyArrow's multithreaded C++ parser
+    contents = await file.read()
+    df = await run_in_threadpool(pd.read_csv, io.BytesIO(contents), engine="pyarrow")
+    # Training and plotting are CPU-bound too, so keep them off the event loop as well
+    return await run_in_threadpool(_rf_efficiency, df)
+
+def _rf_efficiency(df: pd.DataFrame):
     # Use the train_rf_model function
     model = train_rf_model(df)
 
@@ -98,38 +381,64 @@ async def rf_efficiency(file: UploadFile = File(...)):
     new_data = np.array([[2500, 10, 25]])
     pred = model.predict(new_data)[0]
 
-    # Plot
-    plt.figure(figsize=(10, 6))
-    plt.scatter(df["freq_MHz"], df["efficiency"], color="blue", alpha=0.6, s=50)
-    plt.xlabel("Frequency (MHz)")
-    plt.ylabel("Efficiency (%)")
-    plt.title("RF Efficiency Prediction")
-    plt.grid(True, alpha=0.3)
-    plot_path = os.path.join(os.getcwd(), "backend", "ml_model", "rf_plot.png")
-    os.makedirs(os.path.dirname(plot_path), exist_ok=True)
-    plt.savefig(plot_path, bbox_inches="tight", dpi=100)
-    plt.close()
-
-    return JSONResponse({
+    # Plot (re-rendered only when the plotted data changes)
+    plot_key = content_key("rf", df[["freq_MHz", "efficiency"]].to_numpy(dtype=float)).hex()
+    image = _cached_plot(plot_key, lambda: _render_rf_plot(df))
+    _publish_plot(image, _RF_PLOT_PATH)
+
+    return ORJSONResponse({
         "predicted_efficiency": round(float(pred), 2),
-        "plot_path": "/plot",
-        "model_coefficients": model.coef_.tolist(),
+        "plot_path": f"/plot?key={plot_key}",
+        "model_coefficients": model.coef_,
         "model_intercept": float(model.intercept_)
     })
 
 @app.get("/plot")
-def get_plot():
-    plot_path = os.path.join(os.getcwd(), "backend", "ml_model", "rf_plot.png")
-    return FileResponse(plot_path)
+def get_plot(key: Optional[str] = None):
+    return _plot_response(key, _RF_PLOT_PATH)
+
+def _render_stock_plot(df: pd.DataFrame, ticker: str) -> bytes:
+    with _pooled_figure((12, 6)) as fig:
+        return _draw_stock_plot(fig, df, ticker)
+
+def _draw_stock_plot(fig: "Figure", df: pd.DataFrame, ticker: str) -> bytes:
+    ax1, ax2 = fig.subplots(1, 2)
+    
+    # Plot 1: Price over time
+    ax1.plot(df.index, df['Close'], color='#118DFF', linewidth=2)
+    ax1.fill_between(df.index, df['Close'], alpha=0.3, color='#118DFF')
+    ax1.set_xlabel("Date")
+    ax1.set_ylabel("Close Price ($)")
+    ax1.set_title(f"{ticker} Price History")
+    ax1.grid(True, alpha=0.3)
+    ax1.tick_params(axis='x', labelrotation=45)
+    
+    # Plot 2: Volume over time
+    colors = np.where(df['daily_return'].to_numpy() > 0, '#12239E', '#E66C37')
+    ax2.bar(df.index, df['volume_millions'], color=colors, alpha=0.6)
+    ax2.set_xlabel("Date")
+    ax2.set_ylabel("Volume (Millions)")
+    ax2.set_title(f"{ticker} Trading Volume")
+    ax2.grid(True, alpha=0.3)
+    ax2.tick_params(axis='x', labelrotation=45)
+    
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, **_PLOT_SAVE_KWARGS)
+    return buf.getvalue()
 
 @app.post("/stock/analyze")
 async def analyze_stock(req: StockAnalysisRequest):
+    # Data fetch, model fit and plotting all block, so run the whole analysis on a worker thread
+    return await run_in_threadpool(_analyze_stock, req)
+
+def _analyze_stock(req: StockAnalysisRequest):
     try:
         # Fetch real-time stock data
         df = fetch_stock_data(ticker=req.ticker, period=req.period)
         
         if len(df) < 5:
-            return JSONResponse({
+            return ORJSONResponse({
                 "error": "Insufficient data",
                 "message": f"Only {len(df)} data points available for {req.ticker}"
             }, status_code=400)
@@ -137,46 +446,30 @@ async def analyze_stock(req: StockAnalysisRequest):
         # Train model
         model = train_stock_model(df)
         
+        # Pull the columns out as ndarrays once; reused for the prediction and the statistics
+        volume = df['volume_millions'].to_numpy()
+        price_change = df['price_change_pct'].to_numpy()
+        volatility_arr = df['volatility'].to_numpy()
+        close = df['Close'].to_numpy()
+        
         # Get latest data for prediction
-        latest = df.iloc[-1]
-        new_data = np.array([[latest['volume_millions'], latest['price_change_pct'], latest['volatility']]])
+        new_data = np.array([[volume[-1], price_change[-1], volatility_arr[-1]]])
         predicted_return = model.predict(new_data)[0]
         
-        # Create visualization
-        plt.figure(figsize=(12, 6))
-        
-        # Plot 1: Price over time
-        plt.subplot(1, 2, 1)
-        plt.plot(df.index, df['Close'], color='#118DFF', linewidth=2)
-        plt.fill_between(df.index, df['Close'], alpha=0.3, color='#118DFF')
-        plt.xlabel("Date")
-        plt.ylabel("Close Price ($)")
-        plt.title(f"{req.ticker} Price History")
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        
-        # Plot 2: Volume over time
-        plt.subplot(1, 2, 2)
-        colors = ['#12239E' if r > 0 else '#E66C37' for r in df['daily_return']]
-        plt.bar(df.index, df['volume_millions'], color=colors, alpha=0.6)
-        plt.xlabel("Date")
-        plt.ylabel("Volume (Millions)")
-        plt.title(f"{req.ticker} Trading Volume")
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        
-        plt.tight_layout()
-        plot_path = os.path.join(os.getcwd(), "backend", "ml_model", "stock_plot.png")
-        os.makedirs(os.path.dirname(plot_path), exist_ok=True)
-        plt.savefig(plot_path, bbox_inches="tight", dpi=100)
-        plt.close()
+        # Create visualization (re-rendered only when the plotted data changes)
+        plot_key = content_key(
+            "stock", req.ticker, req.period, df.index.asi8,
+            df[['Close', 'volume_millions', 'daily_return']].to_numpy(dtype=float)
+        ).hex()
+        image = _cached_plot(plot_key, lambda: _render_stock_plot(df, req.ticker))
+        _publish_plot(image, _STOCK_PLOT_PATH)
         
         # Calculate statistics
-        avg_return = df['daily_return'].mean()
-        volatility = df['volatility'].mean()
-        total_return = ((df['Close'].iloc[-1] - df['Close'].iloc[0]) / df['Close'].iloc[0]) * 100
+        avg_return = df['daily_return'].to_numpy().mean()
+        volatility = volatility_arr.mean()
+        total_return = ((close[-1] - close[0]) / close[0]) * 100
         
-        return JSONResponse({
+        return ORJSONResponse({
             "ticker": req.ticker,
             "period": req.period,
             "predicted_return": round(float(predicted_return), 3),
@@ -184,7 +477,7 @@ async def analyze_stock(req: StockAnalysisRequest):
                 "avg_daily_return": round(float(avg_return), 3),
                 "avg_volatility": round(float(volatility), 3),
                 "total_return": round(float(total_return), 2),
-                "latest_price": round(float(df['Close'].iloc[-1]), 2),
+                "latest_price": round(float(close[-1]), 2),
                 "data_points": int(len(df))
             },
             "model_info": {
@@ -195,149 +488,261 @@ async def analyze_stock(req: StockAnalysisRequest):
                 },
                 "intercept": round(float(model.intercept_), 6)
             },
-            "plot_path": "/stock_plot"
+            "plot_path": f"/stock_plot?key={plot_key}"
         })
     except ValueError as e:
         # Handle data fetching errors with user-friendly messages
-        return JSONResponse({
+        return ORJSONResponse({
             "error": str(e),
             "message": "Please check the ticker symbol and try again. If the problem persists, the API may be temporarily unavailable."
         }, status_code=400)
     except Exception as e:
         # Handle unexpected errors
-        return JSONResponse({
+        return ORJSONResponse({
             "error": f"Analysis failed: {str(e)}",
             "type": type(e).__name__
         }, status_code=500)
 
 @app.get("/stock_plot")
-def get_stock_plot():
-    plot_path = os.path.join(os.getcwd(), "backend", "ml_model", "stock_plot.png")
-    return FileResponse(plot_path)
+def get_stock_plot(key: Optional[str] = None):
+    return _plot_response(key, _STOCK_PLOT_PATH)
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http
+
+async def fetch_stooq_close(client: httpx.AsyncClient, ticker: str, start: datetime, end: datetime) -> pd.Series:
+    """Download daily closing prices for one ticker from Stooq's CSV endpoint.
+
+    Falls back to pandas_datareader's Stooq reader if the direct download fails.
+    """
+    symbol = ticker if "." in ticker else f"{ticker}.US"  # Same default market as pandas_datareader
+    try:
+        resp = await client.get(STOOQ_CSV_URL, params={
+            "s": symbol.lower(),
+            "i": "d",
+            "d1": start.strftime("%Y%m%d"),
+            "d2": end.strftime("%Y%m%d"),
+        })
+        resp.raise_for_status()
+        df = pd.read_csv(io.BytesIO(resp.content), engine="pyarrow")
+        if df.empty or "Close" not in df.columns:
+            raise ValueError(f"No Stooq data for {ticker}")
+        return df.set_index(pd.to_datetime(df["Date"]))["Close"].sort_index()
+    except (httpx.HTTPError, ValueError):
+        # pandas_datareader is blocking, so run it on a worker thread
+        return await run_in_threadpool(_fetch_stooq_close_pdr, ticker, start, end)
+
+def _fetch_stooq_close_pdr(ticker: str, start: datetime, end: datetime) -> pd.Series:
+    import pandas_datareader as pdr  # Fallback path only; keep it out of worker startup
+    df = pdr.DataReader(ticker, 'stooq', start, end, session=SESSION)
+    if df.empty:
+        raise ValueError(f"No Stooq data for {ticker}")
+    return df['Close'].sort_index()
+
+# Recently fetched Stooq closes: an in-process TTL cache in front of Parquet files that are
+# shared by every worker and survive restarts. Only touched from the event loop thread.
+STOOQ_CACHE_TTL_SECONDS = 300
+STOOQ_CACHE_DIR = Path(tempfile.gettempdir()) / "qrpo_stooq"
+_STOOQ_CACHE: TTLCache = TTLCache(maxsize=512, ttl=STOOQ_CACHE_TTL_SECONDS)
+
+def _read_cached_close(path: Path) -> Optional[pd.Series]:
+    df = read_fresh_parquet(path, STOOQ_CACHE_TTL_SECONDS)
+    if df is None or "Close" not in df:
+        return None
+    return df["Close"]
+
+def _write_cached_close(close: pd.Series, path: Path) -> None:
+    write_parquet_atomic(close.to_frame("Close"), path)
+
+async def fetch_stooq_close_cached(client: httpx.AsyncClient, ticker: str, start: datetime, end: datetime) -> pd.Series:
+    """fetch_stooq_close behind the memory and Parquet caches, keyed on (ticker, start day, end day)."""
+    key = (ticker, start.date(), end.date())
+    close = _STOOQ_CACHE.get(key)
+    if close is None:
+        path = parquet_cache_path(STOOQ_CACHE_DIR, *key)
+        close = await run_in_threadpool(_read_cached_close, path)
+        if close is None:
+            close = await fetch_stooq_close(client, ticker, start, end)
+            try:
+                await run_in_threadpool(_write_cached_close, close, path)
+            except (OSError, ValueError) as e:
+                # The download succeeded; a full or read-only cache dir shouldn't fail the ticker
+                logger.warning("Could not cache Stooq closes for %s: %s", ticker, e)
+        _STOOQ_CACHE[key] = close
+    return close
 
 @app.get("/simulate/portfolio")
-def simulate_portfolio(tickers: str = "TSLA,NVDA,SPY,AMD", weights: str = "0.25,0.25,0.25,0.25"):
+async def simulate_portfolio(
+    tickers: str = "TSLA,NVDA,SPY,AMD",
+    weights: str = "0.25,0.25,0.25,0.25",
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     """
     Fetch recent stock data and compute cumulative portfolio value with FFT analysis.
     """
     try:
         tickers_list = [t.strip().upper() for t in tickers.split(",")]
         weights_arr = np.array([float(w) for w in weights.split(",")])
+        if len(weights_arr) != len(tickers_list):
+            return ORJSONResponse({"error": f"Got {len(weights_arr)} weights for {len(tickers_list)} tickers"},
+                                  status_code=400)
         weights_arr /= weights_arr.sum()  # Normalize weights
 
-        # Fetch data from Stooq for each ticker
+        # Fetch data from Stooq for all tickers concurrently
         end_date = datetime.now()
         start_date = end_date - timedelta(days=90)
         
+        semaphore = asyncio.Semaphore(STOOQ_MAX_CONCURRENCY)
+
+        async def fetch(ticker: str) -> pd.Series:
+            async with semaphore:
+                return await fetch_stooq_close_cached(client, ticker, start_date, end_date)
+
+        results = await asyncio.gather(*[fetch(ticker) for ticker in tickers_list], return_exceptions=True)
         all_data = {}
-        for ticker in tickers_list:
-            try:
-                df = pdr.DataReader(ticker, 'stooq', start_date, end_date)
-                if not df.empty:
-                    all_data[ticker] = df['Close'].sort_index()
-            except Exception as e:
-                print(f"Failed to fetch {ticker}: {e}")
+        failed_tickers = []
+        for ticker, result in zip(tickers_list, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to fetch %s from Stooq: %s", ticker, result)
+                failed_tickers.append(ticker)
+            else:
+                all_data[ticker] = result
         
         if not all_data:
-            return JSONResponse({"error": "No data could be fetched for the provided tickers"}, status_code=400)
-        
-        # Combine into single DataFrame
-        data = pd.DataFrame(all_data)
-        data = data.dropna()
-        
-        if len(data) < 2:
-            return JSONResponse({"error": "Insufficient data points"}, status_code=400)
-        
-        returns = data.pct_change().dropna()
-
-        # Compute correlation matrix
-        correlation_matrix = returns.corr()
-        correlation_data = []
-        for i, ticker1 in enumerate(tickers_list):
-            for j, ticker2 in enumerate(tickers_list):
-                correlation_data.append({
-                    "x": ticker1,
-                    "y": ticker2,
-                    "value": float(correlation_matrix.iloc[i, j])
-                })
-
-        # Compute portfolio value over time
-        portfolio_values = (1 + (returns * weights_arr).sum(axis=1)).cumprod() * 10000
-        portfolio_df = portfolio_values.reset_index()
-        portfolio_df.columns = ['Date', 'Value']
-        
-        # Compute FFT of portfolio curve for volatility spectrum
-        portfolio_returns = portfolio_values.pct_change().dropna().values
-        fft_result = fft_features(portfolio_returns)
-        
-        # Get top 5 frequency components (volatility spectrum)
-        freqs = np.array(fft_result['freqs'])
-        mags = np.array(fft_result['magnitude'])
-        
-        # Find indices of top 5 magnitudes (excluding DC component at index 0)
-        top_indices = np.argsort(mags[1:])[-5:][::-1] + 1
-        top_freqs = [float(freqs[i]) for i in top_indices]
-        top_mags = [float(mags[i]) for i in top_indices]
-        
-        # Calculate mean and std from portfolio returns
-        mean_return = float(np.mean(portfolio_returns))
-        std_return = float(np.std(portfolio_returns))
-
-        # Calculate asset metrics for 3D galaxy visualization
-        asset_metrics = []
-        market_returns = returns[tickers_list[0]] if len(tickers_list) > 0 else returns.mean(axis=1)  # Use first ticker as market proxy
+            return ORJSONResponse({"error": "No data could be fetched for the provided tickers",
+                                   "failed_tickers": failed_tickers}, status_code=400)
+
+        # Simulate what did load, re-normalizing the remaining weights; the failed symbols are
+        # reported back so the client can retry just those
+        if failed_tickers:
+            loaded = np.array([ticker in all_data for ticker in tickers_list])
+            tickers_list = [ticker for ticker in tickers_list if ticker in all_data]
+            weights_arr = weights_arr[loaded] / weights_arr[loaded].sum()
+
+        # The rest is pandas/NumPy number crunching; do it on a worker thread
+        return await run_in_threadpool(_summarize_portfolio, tickers_list, weights_arr, all_data, failed_tickers)
+    except Exception as e:
+        return ORJSONResponse({"error": f"Simulation failed: {str(e)}"}, status_code=500)
+
+def _summarize_portfolio(tickers_list: List[str], weights_arr: np.ndarray, all_data: Dict[str, pd.Series],
+                         failed_tickers: List[str]):
+    """Build the /simulate/portfolio payload from the fetched close series."""
+    # Align the close series on their common dates and stack them straight into one (T, N)
+    # float64 block, rather than building a DataFrame only to dropna() across tickers
+    columns = [all_data[ticker] for ticker in tickers_list]
+    common = columns[0].index
+    for series in columns[1:]:
+        common = common.intersection(series.index)
+    common = common.sort_values()
+    prices = np.column_stack([series.reindex(common).to_numpy(dtype=np.float64) for series in columns])
+    valid = ~np.isnan(prices).any(axis=1)
+    prices, dates = prices[valid], common[valid]
+    
+    if len(prices) < 2:
+        return ORJSONResponse({"error": "Insufficient data points", "failed_tickers": failed_tickers}, status_code=400)
+    
+    returns = prices[1:] / prices[:-1] - 1.0
+    dates = dates[1:]
+
+    # Compute correlation matrix; unroll it from the raw ndarray (tolist() yields Python floats)
+    corr = np.atleast_2d(np.corrcoef(returns, rowvar=False)).tolist()
+    correlation_data = [
+        {"x": ticker1, "y": ticker2, "value": corr[i][j]}
+        for i, ticker1 in enumerate(tickers_list)
+        for j, ticker2 in enumerate(tickers_list)
+    ]
+
+    # Compute portfolio value over time
+    # Fused row-wise dot product instead of materializing returns * weights before summing
+    port_ret = weighted_returns(returns, weights_arr)
+    portfolio_values = np.cumprod(1.0 + port_ret) * 10000.0
+    
+    # Compute FFT of portfolio curve for volatility spectrum. The value curve's period-over-period
+    # change is just port_ret again, minus the first period (no base value before it)
+    portfolio_returns = port_ret[1:]
+    fft_result = fft_features(portfolio_returns, top_k=5)
+    
+    # Get top 5 frequency components (volatility spectrum)
+    freqs = fft_result['freqs']
+    mags = fft_result['magnitude']
+    top_indices = fft_result['top_indices']
+    top_freqs = [float(freqs[i]) for i in top_indices]
+    top_mags = [float(mags[i]) for i in top_indices]
+    
+    # Calculate mean and std from portfolio returns
+    mean_return, std_return = portfolio_stats(portfolio_returns)
+
+    # Calculate asset metrics for 3D galaxy visualization
+    # First ticker is the market proxy, so correlation to market is column 0 of the matrix
+    asset_metrics = []
+    asset_means = returns.mean(axis=0)
+    asset_vols = returns.std(axis=0, ddof=1)
+    
+    for i, ticker in enumerate(tickers_list):
+        # Calculate metrics
+        mean_asset_return = float(asset_means[i])
+        volatility = float(asset_vols[i])
+        correlation_to_market = corr[i][0]
+        weight = float(weights_arr[i])
         
-        for i, ticker in enumerate(tickers_list):
-            asset_returns = returns[ticker]
-            
-            # Calculate metrics
-            mean_asset_return = float(asset_returns.mean())
-            volatility = float(asset_returns.std())
-            correlation_to_market = float(returns[ticker].corr(market_returns))
-            weight = float(weights_arr[i])
-            
-            asset_metrics.append({
-                "ticker": ticker,
-                "weight": weight,
-                "return": mean_asset_return,
-                "volatility": volatility,
-                "correlation": correlation_to_market
-            })
+        asset_metrics.append({
+            "ticker": ticker,
+            "weight": weight,
+            "return": mean_asset_return,
+            "volatility": volatility,
+            "correlation": correlation_to_market
+        })
 
-        return {
-            "date": portfolio_df["Date"].dt.strftime("%Y-%m-%d").tolist(),
-            "value": portfolio_df["Value"].tolist(),
-            "tickers": tickers_list,
-            "correlation_matrix": correlation_data,
-            "assets": asset_metrics,
-            "fft_spectrum": {
-                "frequencies": top_freqs,
-                "magnitudes": top_mags,
-                "mean": mean_return,
-                "std": std_return
-            },
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        return JSONResponse({"error": f"Simulation failed: {str(e)}"}, status_code=500)
+    return ORJSONResponse({
+        "date": np.datetime_as_string(dates.to_numpy(), unit="D").tolist(),
+        "value": portfolio_values,
+        "tickers": tickers_list,
+        "failed_tickers": failed_tickers,
+        "correlation_matrix": correlation_data,
+        "assets": asset_metrics,
+        "fft_spectrum": {
+            "frequencies": top_freqs,
+            "magnitudes": top_mags,
+            "mean": mean_return,
+            "std": std_return
+        },
+        "timestamp": datetime.now().isoformat()
+    })
 
 @app.get("/quantum/state")
-def quantum_state(n: int = 4):
+def quantum_state(n: int = Query(4, ge=1, le=64)):
     """
     Get quantum state visualization data for Bloch sphere representation.
     Returns theta and phi angles for each qubit.
     """
+    return Response(content=_quantum_state_json(n), media_type="application/json")
+
+@lru_cache(maxsize=64)
+def _quantum_state_json(n: int) -> bytes:
+    """Serialized preview for n qubits; it is seeded, so the first response can be reused as-is.
+    n is bounded by the route (1..64), so the cache holds at most a few hundred KB."""
     from quantum.qaoa_optimizer import get_qaoa_state_preview
     
     qubits = get_qaoa_state_preview(n)
-    return {"qubits": qubits}
+    return orjson.dumps({"qubits": qubits}, option=orjson.OPT_SERIALIZE_NUMPY)
 
 class ChatRequest(BaseModel):
     message: str
     conversation_history: List[dict] = []
 
+# yfinance lookups behind /chat; quotes are cached briefly so repeated questions skip the network
+_YF_CACHE: TTLCache = TTLCache(maxsize=512, ttl=120)
+_YF_CACHE_LOCK = threading.Lock()
+# yf.download keeps per-call results in process-global dicts, so concurrent /chat handlers on
+# the threadpool must take turns (each download still fetches its tickers in parallel)
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
 def get_stock_data(ticker: str):
-    """Fetch real-time stock data from yfinance"""
+    """Fetch real-time stock data from yfinance (cached for two minutes per ticker)"""
+    ticker = ticker.upper()
+    return cached_call(_YF_CACHE, _YF_CACHE_LOCK, ("stock", ticker), lambda: _fetch_stock_data_yf(ticker))
+
+def _fetch_stock_data_yf(ticker: str):
     try:
         import yfinance as yf
         stock = yf.Ticker(ticker)
@@ -364,87 +769,77 @@ def get_stock_data(ticker: str):
         return None
 
 def analyze_market_sentiment():
-    """Analyze current market sentiment using major indices"""
+    """Analyze current market sentiment using major indices (cached for two minutes)"""
+    return cached_call(_YF_CACHE, _YF_CACHE_LOCK, ("sentiment",), _fetch_market_sentiment)
+
+def _fetch_market_sentiment():
     try:
-        import yfinance as yf
         indices = {
             'SPY': 'S&P 500',
             'QQQ': 'Nasdaq',
             'DIA': 'Dow Jones'
         }
         
-        sentiment = {}
-        for ticker, name in indices.items():
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1mo")
-            if not hist.empty:
-                current = hist['Close'].iloc[-1]
-                month_ago = hist['Close'].iloc[0]
-                change = ((current - month_ago) / month_ago) * 100
-                sentiment[name] = round(change, 2)
-        
-        return sentiment
+        moves = _download_month_moves(list(indices))
+        if not moves:
+            return None  # yf.download reports failures as all-NaN columns; don't cache them
+        return {name: round(moves[ticker][1], 2) for ticker, name in indices.items() if ticker in moves}
     except:
         return None
 
-def get_smart_finance_response(question: str) -> str:
-    """Generate intelligent responses based on real market data"""
-    import re
-    q_lower = question.lower()
-    
-    # Extract ticker symbols from question (e.g., AAPL, MSFT, TSLA)
-    ticker_pattern = r'\b[A-Z]{1,5}\b'
-    potential_tickers = re.findall(ticker_pattern, question)
-    
-    # Check for specific stock mentions
-    if potential_tickers:
-        ticker = potential_tickers[0]
-        stock_data = get_stock_data(ticker)
-        if stock_data:
-            trend = "📈 up" if stock_data['month_change'] > 0 else "📉 down"
-            return f"""📊 **{stock_data['name']} ({stock_data['ticker']}) Analysis**
-
-**Current Data:**
-• Price: ${stock_data['price']}
-• 1-Month Change: {trend} {abs(stock_data['month_change'])}%
-• Sector: {stock_data['sector']}
-• P/E Ratio: {stock_data['pe_ratio']}
-
-**Analysis:**
-{get_stock_recommendation(stock_data)}
+def get_stocks_batch(tickers: List[str]):
+    """Fetch latest price and 1-month change for several tickers in one batched download (cached)"""
+    tickers = [t.upper() for t in tickers]
+    return cached_call(_YF_CACHE, _YF_CACHE_LOCK, ("batch", tuple(tickers)), lambda: _fetch_stocks_batch(tickers))
 
-**Technical Levels:**
-• Support: ${round(stock_data['price'] * 0.95, 2)}
-• Resistance: ${round(stock_data['price'] * 1.05, 2)}
+def _fetch_stocks_batch(tickers: List[str]):
+    try:
+        moves = _download_month_moves(tickers)
+        if not moves:
+            return None  # Nothing came back; let cached_call retry on the next question
+        return [
+            {'ticker': t, 'price': round(moves[t][0], 2), 'month_change': round(moves[t][1], 2)}
+            for t in tickers if t in moves
+        ]
+    except:
+        return None
 
-This is based on real-time market data from Yahoo Finance."""
-    
-    # Stock buying questions
-    if any(word in q_lower for word in ["buy", "purchase", "invest in", "stocks should i", "what stocks"]):
-        market_sentiment = analyze_market_sentiment()
-        sentiment_text = ""
-        if market_sentiment:
-            sentiment_text = "\n**Current Market:**\n"
-            for index, change in market_sentiment.items():
-                trend = "📈" if change > 0 else "📉"
-                sentiment_text += f"• {index}: {trend} {change}%\n"
-        
-        # Get real data for top recommendations
-        recommendations = []
-        top_picks = ['NVDA', 'MSFT', 'AAPL', 'GOOGL']
-        for ticker in top_picks:
-            data = get_stock_data(ticker)
-            if data:
-                recommendations.append(data)
-        
-        rec_text = ""
-        if recommendations:
-            rec_text = "\n**Top Picks (Real-Time Data):**\n"
-            for stock in recommendations[:3]:
-                trend = "📈" if stock['month_change'] > 0 else "📉"
-                rec_text += f"• **{stock['ticker']}** ${stock['price']} ({trend} {abs(stock['month_change'])}% this month)\n"
-        
-        return f"""📈 **Smart Stock Recommendations**
+def _download_month_moves(tickers: List[str]) -> Dict[str, Tuple[float, float]]:
+    """Latest close and 1-month % change per ticker from a single threaded yf.download call"""
+    import yfinance as yf
+    with _YF_DOWNLOAD_LOCK:
+        closes = yf.download(tickers, period="1mo", group_by="column", threads=True, progress=False)["Close"]
+    moves = {}
+    for ticker in tickers:
+        if ticker not in closes:
+            continue
+        series = closes[ticker].dropna()
+        if series.empty:
+            continue
+        current, month_ago = series.iloc[-1], series.iloc[0]
+        moves[ticker] = (current, ((current - month_ago) / month_ago) * 100)
+    return moves
+
+# /chat intent matching, compiled once at import. Keywords match as substrings of the lowercased
+# question (so "diversif" also catches "diversify"/"diversification"), one regex scan per intent.
+_TICKER_RE = re.compile(r'\b[A-Z]{1,5}\b')
+
+def _keyword_re(*words: str) -> "re.Pattern[str]":
+    return re.compile("|".join(map(re.escape, words)))
+
+_BUY_KEYWORDS_RE = _keyword_re("buy", "purchase", "invest in", "stocks should i", "what stocks")
+_SELL_KEYWORDS_RE = _keyword_re("sell", "exit", "take profit", "when should i sell")
+_PORTFOLIO_KEYWORDS_RE = _keyword_re("portfolio", "diversif", "allocat", "balance")
+_RISK_KEYWORDS_RE = _keyword_re("risk", "volatil", "protect", "hedge", "drawdown")
+_MARKET_KEYWORDS_RE = _keyword_re("market", "economy", "fed", "inflation", "interest rate", "recession")
+_QUANTUM_KEYWORDS_RE = _keyword_re("quantum", "qaoa", "vqe", "qubit")
+_TECHNICAL_KEYWORDS_RE = _keyword_re("technical", "indicator", "chart", "moving average", "rsi", "macd", "support", "resistance")
+_CRYPTO_KEYWORDS_RE = _keyword_re("crypto", "bitcoin", "ethereum", "btc", "eth", "blockchain")
+_OPTIONS_KEYWORDS_RE = _keyword_re("option", "call", "put", "derivative", "covered call", "iron condor")
+
+# Canned /chat answers. Only the buy and market answers embed live data; they are filled in
+# from templates, everything else is returned as-is.
+_BUY_RESPONSE_TEMPLATE = """📈 **Smart Stock Recommendations**
 {sentiment_text}
 {rec_text}
 
@@ -462,9 +857,40 @@ This is based on real-time market data from Yahoo Finance."""
 
 ⚠️ **Risk Management:** Monitor Fed policy, inflation data, and earnings reports. Never invest more than you can afford to lose."""
 
-    # Selling questions
-    elif any(word in q_lower for word in ["sell", "exit", "take profit", "when should i sell"]):
-        return """💰 **Strategic Exit Planning (Real-Time Analysis)**
+_MARKET_RESPONSE_TEMPLATE = """🌍 **Market & Economic Analysis**
+
+{sentiment_text}
+
+**Key Factors to Watch:**
+
+**Federal Reserve:**
+• Interest rate decisions (affects borrowing costs)
+• Quantitative tightening/easing
+• Forward guidance signals
+
+**Economic Indicators:**
+• 📊 CPI/PCE inflation data
+• 💼 Unemployment rate
+• 🏭 Manufacturing PMI
+• 🏘️ Housing starts
+• 📈 GDP growth rate
+
+**Market Sentiment:**
+• VIX (Fear Index): <15 = complacent, >30 = panic
+• Put/Call Ratio: <0.7 = bullish, >1.1 = bearish  
+• Breadth indicators (advance/decline line)
+
+**Recession Signals:**
+⚠️ Inverted yield curve (2yr > 10yr)
+⚠️ 3+ months of declining GDP
+⚠️ Rising unemployment + declining earnings
+
+**Action Plan:**
+• Stay diversified across asset classes
+• Increase cash in late cycle
+• Favor quality companies with strong balance sheets"""
+
+_SELL_RESPONSE = """💰 **Strategic Exit Planning (Real-Time Analysis)**
 
 **When to Sell:**
 1. **Profit Target Hit** - Lock in 20-30% gains on growth stocks
@@ -490,9 +916,7 @@ This is based on real-time market data from Yahoo Finance."""
 
 **Pro Tip:** Set alerts for technical breaks and earnings dates. Don't let emotions drive decisions!"""
 
-    # Portfolio/diversification questions
-    elif any(word in q_lower for word in ["portfolio", "diversif", "allocat", "balance"]):
-        return """🎯 **Optimal Portfolio Construction**
+_PORTFOLIO_RESPONSE = """🎯 **Optimal Portfolio Construction**
 
 **Recommended Allocation (Moderate Risk):**
 • 40% - Large Cap Stocks (SPY, VOO)
@@ -516,9 +940,7 @@ This is based on real-time market data from Yahoo Finance."""
 **Quantum Enhancement:**  
 Use QAOA algorithms (like in this app!) to optimize correlation matrices and find efficient frontier allocations with better risk-adjusted returns."""
 
-    # Risk questions
-    elif any(word in q_lower for word in ["risk", "volatil", "protect", "hedge", "drawdown"]):
-        return """🛡️ **Risk Management Strategies**
+_RISK_RESPONSE = """🛡️ **Risk Management Strategies**
 
 **Position Sizing:**
 • Max 5% per stock
@@ -544,52 +966,7 @@ Use QAOA algorithms (like in this app!) to optimize correlation matrices and fin
 
 **Advanced:** Use quantum VQE algorithms for more accurate Value-at-Risk (VaR) calculations and tail-risk modeling."""
 
-    # Market/economic questions
-    elif any(word in q_lower for word in ["market", "economy", "fed", "inflation", "interest rate", "recession"]):
-        market_sentiment = analyze_market_sentiment()
-        sentiment_text = ""
-        if market_sentiment:
-            sentiment_text = "**Current Market Performance:**\n"
-            for index, change in market_sentiment.items():
-                trend = "📈 Bullish" if change > 2 else "📉 Bearish" if change < -2 else "➡️ Neutral"
-                sentiment_text += f"• {index}: {change}% ({trend})\n"
-        
-        return f"""🌍 **Market & Economic Analysis**
-
-{sentiment_text}
-
-**Key Factors to Watch:**
-
-**Federal Reserve:**
-• Interest rate decisions (affects borrowing costs)
-• Quantitative tightening/easing
-• Forward guidance signals
-
-**Economic Indicators:**
-• 📊 CPI/PCE inflation data
-• 💼 Unemployment rate
-• 🏭 Manufacturing PMI
-• 🏘️ Housing starts
-• 📈 GDP growth rate
-
-**Market Sentiment:**
-• VIX (Fear Index): <15 = complacent, >30 = panic
-• Put/Call Ratio: <0.7 = bullish, >1.1 = bearish  
-• Breadth indicators (advance/decline line)
-
-**Recession Signals:**
-⚠️ Inverted yield curve (2yr > 10yr)
-⚠️ 3+ months of declining GDP
-⚠️ Rising unemployment + declining earnings
-
-**Action Plan:**
-• Stay diversified across asset classes
-• Increase cash in late cycle
-• Favor quality companies with strong balance sheets"""
-
-    # Quantum computing questions
-    elif any(word in q_lower for word in ["quantum", "qaoa", "vqe", "qubit"]):
-        return """⚛️ **Quantum Computing in Finance**
+_QUANTUM_RESPONSE = """⚛️ **Quantum Computing in Finance**
 
 **Key Applications:**
 
@@ -621,9 +998,7 @@ Use QAOA algorithms (like in this app!) to optimize correlation matrices and fin
 
 **Practical Use:** Combine quantum optimization with classical ML for hybrid strategies. Try the "Run Optimization" feature in this app!"""
 
-    # Technical analysis questions
-    elif any(word in q_lower for word in ["technical", "indicator", "chart", "moving average", "rsi", "macd", "support", "resistance"]):
-        return """📊 **Technical Analysis Toolkit**
+_TECHNICAL_RESPONSE = """📊 **Technical Analysis Toolkit**
 
 **Trend Indicators:**
 • **MA 50/200** - Golden cross = buy | Death cross = sell
@@ -651,9 +1026,7 @@ Use QAOA algorithms (like in this app!) to optimize correlation matrices and fin
 
 **Pro Tip:** Use 3+ indicators for confirmation. Never trade on a single signal. This app uses RF features from FFT analysis for signal processing!"""
 
-    # Crypto questions  
-    elif any(word in q_lower for word in ["crypto", "bitcoin", "ethereum", "btc", "eth", "blockchain"]):
-        return """₿ **Cryptocurrency Investment Guide**
+_CRYPTO_RESPONSE = """₿ **Cryptocurrency Investment Guide**
 
 **Major Cryptocurrencies:**
 • **Bitcoin (BTC)** - Digital gold, store of value
@@ -678,9 +1051,7 @@ Use QAOA algorithms (like in this app!) to optimize correlation matrices and fin
 
 **Caution:** Crypto is highly volatile (50%+ swings). Only invest what you can afford to lose. Not FDIC insured."""
 
-    # Options/derivatives
-    elif any(word in q_lower for word in ["option", "call", "put", "derivative", "covered call", "iron condor"]):
-        return """📜 **Options Trading Strategies**
+_OPTIONS_RESPONSE = """📜 **Options Trading Strategies**
 
 **Basic Strategies:**
 
@@ -712,9 +1083,7 @@ Use QAOA algorithms (like in this app!) to optimize correlation matrices and fin
 
 **Risk Warning:** Options can expire worthless. Start small, paper trade first, and never risk more than 5% per trade."""
 
-    # General/default response
-    else:
-        return """💼 **AI Finance Assistant (Real-Time Data)**
+_DEFAULT_RESPONSE = """💼 **AI Finance Assistant (Real-Time Data)**
 
 I can help you with:
 
@@ -747,6 +1116,90 @@ I can help you with:
 
 I provide actionable advice using **real-time data from Yahoo Finance**! 📈"""
 
+def _buy_response() -> str:
+    market_sentiment = analyze_market_sentiment()
+    sentiment_text = ""
+    if market_sentiment:
+        sentiment_text = "\n**Current Market:**\n"
+        for index, change in market_sentiment.items():
+            trend = "📈" if change > 0 else "📉"
+            sentiment_text += f"• {index}: {trend} {change}%\n"
+    
+    # Get real data for top recommendations (one batched download for all picks)
+    top_picks = ['NVDA', 'MSFT', 'AAPL', 'GOOGL']
+    recommendations = get_stocks_batch(top_picks) or []
+    
+    rec_text = ""
+    if recommendations:
+        rec_text = "\n**Top Picks (Real-Time Data):**\n"
+        for stock in recommendations[:3]:
+            trend = "📈" if stock['month_change'] > 0 else "📉"
+            rec_text += f"• **{stock['ticker']}** ${stock['price']} ({trend} {abs(stock['month_change'])}% this month)\n"
+
+    return _BUY_RESPONSE_TEMPLATE.format(sentiment_text=sentiment_text, rec_text=rec_text)
+
+def _market_response() -> str:
+    market_sentiment = analyze_market_sentiment()
+    sentiment_text = ""
+    if market_sentiment:
+        sentiment_text = "**Current Market Performance:**\n"
+        for index, change in market_sentiment.items():
+            trend = "📈 Bullish" if change > 2 else "📉 Bearish" if change < -2 else "➡️ Neutral"
+            sentiment_text += f"• {index}: {change}% ({trend})\n"
+
+    return _MARKET_RESPONSE_TEMPLATE.format(sentiment_text=sentiment_text)
+
+# Ordered intent dispatch: a str entry is a static answer, a callable builds one from live data
+_INTENT_RESPONSES = (
+    (_BUY_KEYWORDS_RE, _buy_response),
+    (_SELL_KEYWORDS_RE, _SELL_RESPONSE),
+    (_PORTFOLIO_KEYWORDS_RE, _PORTFOLIO_RESPONSE),
+    (_RISK_KEYWORDS_RE, _RISK_RESPONSE),
+    (_MARKET_KEYWORDS_RE, _market_response),
+    (_QUANTUM_KEYWORDS_RE, _QUANTUM_RESPONSE),
+    (_TECHNICAL_KEYWORDS_RE, _TECHNICAL_RESPONSE),
+    (_CRYPTO_KEYWORDS_RE, _CRYPTO_RESPONSE),
+    (_OPTIONS_KEYWORDS_RE, _OPTIONS_RESPONSE),
+)
+
+def get_smart_finance_response(question: str) -> str:
+    """Generate intelligent responses based on real market data"""
+    q_lower = question.lower()
+    
+    # Extract ticker symbols from question (e.g., AAPL, MSFT, TSLA)
+    potential_tickers = _TICKER_RE.findall(question)
+    
+    # Check for specific stock mentions
+    if potential_tickers:
+        ticker = potential_tickers[0]
+        stock_data = get_stock_data(ticker)
+        if stock_data:
+            trend = "📈 up" if stock_data['month_change'] > 0 else "📉 down"
+            return f"""📊 **{stock_data['name']} ({stock_data['ticker']}) Analysis**
+
+**Current Data:**
+• Price: ${stock_data['price']}
+• 1-Month Change: {trend} {abs(stock_data['month_change'])}%
+• Sector: {stock_data['sector']}
+• P/E Ratio: {stock_data['pe_ratio']}
+
+**Analysis:**
+{get_stock_recommendation(stock_data)}
+
+**Technical Levels:**
+• Support: ${round(stock_data['price'] * 0.95, 2)}
+• Resistance: ${round(stock_data['price'] * 1.05, 2)}
+
+This is based on real-time market data from Yahoo Finance."""
+    
+    # Topic questions: first matching intent wins, in the order of _INTENT_RESPONSES
+    for pattern, response in _INTENT_RESPONSES:
+        if pattern.search(q_lower):
+            return response if isinstance(response, str) else response()
+
+    # General/default response
+    return _DEFAULT_RESPONSE
+
 def get_stock_recommendation(stock_data):
     """Generate recommendation based on stock performance"""
     change = stock_data['month_change']
@@ -784,8 +1237,8 @@ async def chat(req: ChatRequest):
     Uses yfinance for live stock prices and market analysis.
     """
     try:
-        # Use smart responses with real market data
-        response_text = get_smart_finance_response(req.message)
+        # Use smart responses with real market data (yfinance calls block, so use a worker thread)
+        response_text = await run_in_threadpool(get_smart_finance_response, req.message)
         
         return {
             "response": response_text,
@@ -795,7 +1248,7 @@ async def chat(req: ChatRequest):
         
     except Exception as e:
         print(f"Chat error: {str(e)}")
-        return JSONResponse({
+        return ORJSONResponse({
             "response": f"❌ Error: {str(e)}\n\nPlease try again with a different question.",
             "error": str(e)
         }, status_code=200)
@@ -0,0 +1,99 @@
+"""Numba-compiled numeric kernels shared by the API endpoints.
+
+Every kernel is declared with an explicit signature, so it is compiled when this module is
+imported (and cached on disk with cache=True) rather than on the first request. Numba is
+optional: without it the decorator is a no-op and the same code runs as plain Python/NumPy.
+
+Inputs are typed as read-only arrays: pandas' copy-on-write hands out read-only views from
+to_numpy(), and Numba still accepts ordinary writable arrays for a read-only parameter.
+"""
+import numpy as np
+
+try:
+    from numba import njit, types
+
+    _F8_1D = types.Array(types.float64, 1, "C", readonly=True)
+    _F8_2D = types.Array(types.float64, 2, "C", readonly=True)
+    _TOP_K_SIG = types.int64[::1](_F8_1D, types.int64)
+    _STATS_SIG = types.UniTuple(types.float64, 2)(_F8_1D)
+    _WEIGHTED_SIG = types.float64[::1](_F8_2D, _F8_1D)
+    _BAND_SIG = types.UniTuple(types.float64, 4)(_F8_1D, _F8_1D)
+except ImportError:  # Numba is optional - fall back to plain Python/NumPy kernels
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+    _TOP_K_SIG = _STATS_SIG = _WEIGHTED_SIG = _BAND_SIG = None
+
+@njit(_TOP_K_SIG, cache=True)
+def top_k_mags(mags, k):
+    """Indices of the k largest magnitudes, largest first.
+
+    One pass over mags keeping a sorted k-slot buffer, instead of sorting the whole spectrum.
+    """
+    k = min(k, mags.size)
+    idx = np.empty(k, dtype=np.int64)
+    val = np.empty(k, dtype=np.float64)
+    filled = 0
+    for i in range(mags.size):
+        m = mags[i]
+        if filled < k:
+            j = filled
+            filled += 1
+        elif m > val[k - 1]:
+            j = k - 1
+        else:
+            continue
+        # Insertion step: shift smaller entries down to keep the buffer sorted
+        while j > 0 and val[j - 1] < m:
+            val[j] = val[j - 1]
+            idx[j] = idx[j - 1]
+            j -= 1
+        val[j] = m
+        idx[j] = i
+    return idx
+
+@njit(_STATS_SIG, cache=True, fastmath=True)
+def portfolio_stats(returns):
+    """Mean and population standard deviation (ddof=0) of a return series."""
+    n = returns.size
+    total = 0.0
+    for i in range(n):
+        total += returns[i]
+    mean = total / n
+    sq = 0.0
+    for i in range(n):
+        d = returns[i] - mean
+        sq += d * d
+    return mean, np.sqrt(sq / n)
+
+@njit(_WEIGHTED_SIG, cache=True, fastmath=True)
+def weighted_returns(returns, weights):
+    """Per-period portfolio return: row-wise dot product of a (T, N) return matrix with weights."""
+    t, n = returns.shape
+    assert weights.size == n, "weights must have one entry per returns column"
+    out = np.empty(t, dtype=np.float64)
+    for i in range(t):
+        acc = 0.0
+        for j in range(n):
+            acc += returns[i, j] * weights[j]
+        out[i] = acc
+    return out
+
+@njit(_BAND_SIG, cache=True, fastmath=True)
+def band_stats(mag, freqs):
+    """Magnitude sums in the low [0, 0.1), mid [0.1, 0.3) and high [0.3, inf) bands, plus the
+    total energy sum(mag**2), accumulated in a single pass over the spectrum."""
+    low = mid = high = total = 0.0
+    for i in range(mag.size):
+        m = mag[i]
+        total += m * m
+        f = freqs[i]
+        if f < 0.1:
+            low += m
+        elif f < 0.3:
+            mid += m
+        else:
+            high += m
+    return low, mid, high, total
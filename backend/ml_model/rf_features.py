@@ -1,55 +1,125 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
+import scipy.fft as sfft
+import requests
 from numpy.typing import NDArray
-from typing import Dict, Any
-from sklearn.linear_model import LinearRegression
-import pandas_datareader as pdr
-from datetime import datetime, timedelta
-import time
-import os
-
-def fft_features(series: NDArray[np.float64]) -> Dict[str, Any]:
+from typing import Dict, Any, Optional
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from cachetools import LRUCache, TTLCache
+import tempfile
+import threading
+import zlib
+from utils.cache import cached_call, content_key, parquet_cache_path, read_fresh_parquet, write_parquet_atomic
+from utils.http import SESSION
+from ml_model._jit import band_stats, top_k_mags
+
+def _amag(spec: NDArray[np.complex128]) -> NDArray[np.float64]:
+    """Alpha-max-plus-beta-min estimate of |spec| (within ~4%, no square root)."""
+    r = np.abs(spec.real)
+    i = np.abs(spec.imag)
+    return np.maximum(r, i) * 0.96043387 + np.minimum(r, i) * 0.39782473
+
+def fft_features(series: NDArray[np.float64], top_k: int = 0, fast_magnitude: bool = False) -> Dict[str, Any]:
     """Compute simple FFT magnitude spectrum and basic stats.
 Input: 1D array of prices or returns.
-Output: dict with frequencies, magnitudes, and summary stats.
+Output: dict with frequency and magnitude arrays (np.ndarray), and summary stats.
+With top_k > 0 also returns "top_indices": the k strongest non-DC bins, largest first.
+With fast_magnitude=True the magnitudes (and band sums) use a sqrt-free approximation,
+good enough for display; total_energy stays exact either way.
 """
     x = np.asarray(series, dtype=float)
     x = x - np.nanmean(x)
     n = len(x)
     if n < 8:
         raise ValueError("Need at least 8 samples for FFT features.")
-    spec = np.fft.rfft(x)
-    mag = np.abs(spec) / n
-    freqs = np.fft.rfftfreq(n, d=1.0)
-    low = mag[(freqs >= 0.0) & (freqs < 0.1)].sum()
-    mid = mag[(freqs >= 0.1) & (freqs < 0.3)].sum()
-    high = mag[(freqs >= 0.3)].sum()
+    # Zero-pad to a 5-smooth length so pocketfft never falls back to Bluestein
+    nfft = sfft.next_fast_len(n, real=True)
+    spec = sfft.rfft(x, n=nfft)
+    mag = (_amag(spec) if fast_magnitude else np.abs(spec)) / n
+    freqs = sfft.rfftfreq(nfft, d=1.0)
+    # rfftfreq is non-negative, so the bands partition the spectrum; one fused pass, no masks
+    low, mid, high, total_energy = band_stats(mag, freqs)
+    if fast_magnitude:
+        # Energy needs |spec|^2 = re^2 + im^2 exactly, which never needed the sqrt
+        total_energy = (spec.real @ spec.real + spec.imag @ spec.imag) / (n * n)
     stats = {
         "n": int(n),
-        "total_energy": float((mag**2).sum()),
+        "nfft": int(nfft),  # Padded transform length; frequency resolution is 1 / nfft
+        "total_energy": float(total_energy),
         "band_energy": {"low": float(low), "mid": float(mid), "high": float(high)},
     }
-    return {"freqs": freqs.tolist(), "magnitude": mag.tolist(), "stats": stats}
+    out = {"freqs": freqs, "magnitude": mag, "stats": stats}
+    if top_k > 0:
+        # Select while the spectrum is still hot in cache; skip the DC bin at index 0
+        out["top_indices"] = top_k_mags(mag[1:], top_k) + 1
+    return out
+
+# Daily bars only change once a day, so feature frames are reused for 15 minutes: in memory
+# per process, and as Parquet files shared by all workers on the machine
+STOCK_DATA_TTL_SECONDS = 900
+STOCK_DATA_CACHE_DIR = Path(tempfile.gettempdir()) / "qrpo_stock_data"
+_STOCK_DATA_CACHE: TTLCache = TTLCache(maxsize=256, ttl=STOCK_DATA_TTL_SECONDS)
+_STOCK_DATA_CACHE_LOCK = threading.Lock()
+
+# Demo-mode starting prices; anything else starts at 100
+_DEMO_BASE_PRICES = {
+    'SPY': 450, 'AAPL': 180, 'MSFT': 380, 'GOOGL': 140,
+    'TSLA': 250, 'AMZN': 145, 'META': 320, 'NVDA': 480,
+    'IBM': 140, 'NFLX': 450, 'DIS': 95
+}
 
-def fetch_stock_data(ticker: str = "SPY", period: str = "1mo") -> pd.DataFrame:
+def fetch_stock_data(ticker: str = "SPY", period: str = "1mo", session: Optional[requests.Session] = None) -> pd.DataFrame:
     """Fetch real-time stock data from multiple sources and prepare features.
     
     Uses Stooq (free, no API key) as primary source with fallback to realistic demo data.
+    Results are cached for STOCK_DATA_TTL_SECONDS per (ticker, period, day).
     
     Args:
         ticker: Stock ticker symbol (default: SPY - S&P 500 ETF)
         period: Time period for data (default: 1mo)
+        session: HTTP session to use (default: the shared keep-alive session)
     
     Returns:
         DataFrame with features: volume_millions, price_change_pct, volatility, daily_return
     """
-    df = None
+    key = (ticker, period, date.today())
+    df = cached_call(_STOCK_DATA_CACHE, _STOCK_DATA_CACHE_LOCK, key,
+                     lambda: _fetch_stock_data_disk_cached(key, ticker, period, session))
+    if df is None:
+        # Demo data is built per call and never cached, so one transient Stooq error
+        # doesn't pin synthetic prices for the whole TTL
+        return _demo_stock_data(ticker)
+    return df.copy()  # Callers get their own frame; the cached one stays pristine
+
+def _fetch_stock_data_disk_cached(key: tuple, ticker: str, period: str, session: Optional[requests.Session]) -> Optional[pd.DataFrame]:
+    path = parquet_cache_path(STOCK_DATA_CACHE_DIR, *key)
+    df = read_fresh_parquet(path, STOCK_DATA_TTL_SECONDS)
+    if df is not None:
+        return df
+    df = _fetch_stock_data_uncached(ticker, period, session)
+    if df is None:
+        return None
+    try:
+        write_parquet_atomic(df, path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not cache stock data for {ticker}: {str(e)[:100]}")
+    return df
+
+def _stock_data_window():
     end_date = datetime.now()
-    start_date = end_date - timedelta(days=35)  # Get extra days for rolling calculations
+    return end_date - timedelta(days=35), end_date  # Get extra days for rolling calculations
+
+def _fetch_stock_data_uncached(ticker: str, period: str, session: Optional[requests.Session]) -> Optional[pd.DataFrame]:
+    """Stooq bars with features, or None when Stooq has no usable data for the ticker."""
+    df = None
+    start_date, end_date = _stock_data_window()
     
     # Try Stooq (free, no API key required, works for US stocks)
     try:
-        df = pdr.DataReader(ticker, 'stooq', start_date, end_date)
+        import pandas_datareader as pdr  # Imported on first fetch to keep it out of worker startup
+        df = pdr.DataReader(ticker, 'stooq', start_date, end_date, session=session or SESSION)
         if not df.empty:
             # Stooq returns data in reverse chronological order, sort it
             df = df.sort_index()
@@ -59,68 +129,123 @@ def fetch_stock_data(ticker: str = "SPY", period: str = "1mo") -> pd.DataFrame:
     except Exception as e:
         print(f"⚠️ Stooq API error for {ticker}: {str(e)[:100]}")
     
-    # If Stooq fails, generate realistic demo data
     if df is None or df.empty or len(df) < 5:
-        print(f"📊 Using demo data for {ticker} (for real data: ensure ticker is valid US stock)")
-        
-        # Generate realistic stock data
-        np.random.seed(hash(ticker) % 2**32)  # Consistent data per ticker
-        dates = pd.date_range(start=start_date, end=end_date, freq='B')  # Business days
-        
-        # Base price depends on ticker
-        base_prices = {
-            'SPY': 450, 'AAPL': 180, 'MSFT': 380, 'GOOGL': 140,
-            'TSLA': 250, 'AMZN': 145, 'META': 320, 'NVDA': 480,
-            'IBM': 140, 'NFLX': 450, 'DIS': 95
-        }
-        base_price = base_prices.get(ticker.upper(), 100)
-        
-        # Simulate realistic price movements with trends
-        returns = np.random.normal(0.001, 0.012, len(dates))
-        prices = base_price * (1 + returns).cumprod()
-        
-        df = pd.DataFrame({
-            'Open': prices * (1 + np.random.normal(0, 0.003, len(dates))),
-            'High': prices * (1 + abs(np.random.normal(0.008, 0.004, len(dates)))),
-            'Low': prices * (1 - abs(np.random.normal(0.008, 0.004, len(dates)))),
-            'Close': prices,
-            'Volume': np.random.randint(40_000_000, 120_000_000, len(dates))
-        }, index=dates)
-        
-        # Ensure High/Low make sense
-        df['High'] = df[['Open', 'High', 'Close']].max(axis=1)
-        df['Low'] = df[['Open', 'Low', 'Close']].min(axis=1)
-    
-    # Calculate features
-    df['volume_millions'] = df['Volume'] / 1_000_000  # Volume in millions
-    df['price_change_pct'] = ((df['Close'] - df['Open']) / df['Open']) * 100  # Daily % change
-    df['volatility'] = df['Close'].rolling(window=5, min_periods=1).std()  # 5-day rolling volatility
-    df['daily_return'] = ((df['Close'] - df['Close'].shift(1)) / df['Close'].shift(1)) * 100  # Daily return %
+        return None
+    return _add_stock_features(df)
+
+def _demo_stock_data(ticker: str) -> pd.DataFrame:
+    """Realistic synthetic bars with features, used when Stooq fails."""
+    print(f"📊 Using demo data for {ticker} (for real data: ensure ticker is valid US stock)")
+    start_date, end_date = _stock_data_window()
+    
+    # Generate realistic stock data. crc32 rather than hash(): str hashes are salted per
+    # process, so only a stable seed gives consistent data per ticker across workers/restarts
+    rng = np.random.default_rng(zlib.crc32(ticker.upper().encode()))
+    dates = pd.date_range(start=start_date, end=end_date, freq='B')  # Business days
+    n = len(dates)
+    
+    # Base price depends on ticker
+    base_price = _DEMO_BASE_PRICES.get(ticker.upper(), 100)
+    
+    # One draw for all the noise: column 0 drives returns, 1-3 perturb Open/High/Low
+    noise = rng.standard_normal((n, 4))
+    
+    # Simulate realistic price movements with trends
+    returns = 0.001 + 0.012 * noise[:, 0]
+    prices = base_price * (1 + returns).cumprod()
+    
+    # Open/High/Low/Close filled into one (n, 4) block, wrapped as a DataFrame once
+    ohlc = np.empty((n, 4))
+    ohlc[:, 0] = prices * (1 + 0.003 * noise[:, 1])
+    ohlc[:, 1] = prices * (1 + np.abs(0.008 + 0.004 * noise[:, 2]))
+    ohlc[:, 2] = prices * (1 - np.abs(0.008 + 0.004 * noise[:, 3]))
+    ohlc[:, 3] = prices
+    
+    # Ensure High/Low make sense
+    ohlc[:, 1] = np.maximum.reduce([ohlc[:, 0], ohlc[:, 1], ohlc[:, 3]])
+    ohlc[:, 2] = np.minimum.reduce([ohlc[:, 0], ohlc[:, 2], ohlc[:, 3]])
+    
+    df = pd.DataFrame(ohlc, index=dates, columns=['Open', 'High', 'Low', 'Close'])
+    df['Volume'] = rng.integers(40_000_000, 120_000_000, n)
+    
+    return _add_stock_features(df)
+
+def _add_stock_features(df: pd.DataFrame) -> pd.DataFrame:
+    # Calculate features on plain arrays, then attach all four columns in a single assign
+    close = df['Close'].to_numpy(dtype=np.float64)
+    opn = df['Open'].to_numpy(dtype=np.float64)
+    daily_return = np.empty_like(close)
+    daily_return[0] = np.nan  # No previous close for the first bar
+    daily_return[1:] = ((close[1:] - close[:-1]) / close[:-1]) * 100
+    df = df.assign(
+        volume_millions=df['Volume'].to_numpy(dtype=np.float64) / 1_000_000,  # Volume in millions
+        price_change_pct=((close - opn) / opn) * 100,  # Daily % change
+        volatility=_rolling_std(close, 5),  # 5-day rolling volatility
+        daily_return=daily_return,  # Daily return %
+    )
     
     # Drop NaN values
     df = df.dropna()
     
     return df
 
-def train_stock_model(df: pd.DataFrame) -> LinearRegression:
+def _rolling_std(values: NDArray[np.float64], window: int) -> NDArray[np.float64]:
+    """Same as Series.rolling(window, min_periods=1).std() (ddof=1) for NaN-free input.
+
+    Full windows are reduced in one pass over a strided view; the first window-1 rows only have
+    partial windows and are done directly (row 0 has a single sample, so it stays NaN).
+    """
+    out = np.full(values.size, np.nan)
+    for i in range(1, min(window - 1, values.size)):
+        out[i] = values[:i + 1].std(ddof=1)
+    if values.size >= window:
+        out[window - 1:] = sliding_window_view(values, window).std(axis=1, ddof=1)
+    return out
+
+# Fitted stock models keyed by a content hash of their training data; a dashboard polling the
+# same ticker refits only when a new bar changes the features
+_STOCK_MODEL_CACHE: LRUCache = LRUCache(maxsize=64)
+_STOCK_MODEL_CACHE_LOCK = threading.Lock()
+
+def train_stock_model(df: pd.DataFrame) -> "_Linreg":
     """Train a model to predict daily returns based on market features.
     
     Args:
         df: DataFrame with columns: volume_millions, price_change_pct, volatility, daily_return
     
     Returns:
-        Trained LinearRegression model
+        Fitted linear model (shared between callers with identical data; treat as read-only)
     """
     X = df[["volume_millions", "price_change_pct", "volatility"]]
     y = df["daily_return"]
-    model = LinearRegression()
-    model.fit(X, y)
-    return model
+    key = content_key(X.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64))
+    return cached_call(_STOCK_MODEL_CACHE, _STOCK_MODEL_CACHE_LOCK, key, lambda: _fit_linear(X, y))
+
+class _Linreg:
+    """Fitted ordinary least-squares model exposing the LinearRegression attributes callers use."""
+    __slots__ = ("coef_", "intercept_")
+
+    def __init__(self, coef: NDArray[np.float64], intercept: float):
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict(self, X) -> NDArray[np.float64]:
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+def _fit_linear(X: pd.DataFrame, y: pd.Series) -> _Linreg:
+    """Fit an ordinary least-squares model of y on the columns of X (with intercept)."""
+    # With three features the solve is trivial; a direct lstsq skips sklearn's validation overhead.
+    # Centering first (as LinearRegression does) leaves the intercept out of the minimum-norm
+    # solution, so collinear inputs get the same coefficients sklearn reported
+    Xv = X.to_numpy(dtype=np.float64)
+    yv = y.to_numpy(dtype=np.float64)
+    x_mean = Xv.mean(axis=0)
+    y_mean = yv.mean()
+    coef = np.linalg.lstsq(Xv - x_mean, yv - y_mean, rcond=None)[0]
+    return _Linreg(coef, float(y_mean - x_mean @ coef))
 
 def train_rf_model(df):
     """Legacy function for RF efficiency - kept for backward compatibility"""
     X = df[["freq_MHz", "power_dBm", "temp_C"]]
     y = df["efficiency"]
-    model = LinearRegression()
-    model.fit(X, y)
-    return model
\ No newline at end of file
+    return _fit_linear(X, y)
\ No newline at end of file
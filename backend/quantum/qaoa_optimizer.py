@@ -1,5 +1,74 @@
 from typing import List, Tuple, Optional
+from functools import lru_cache
+import threading
 import numpy as np
+from cachetools import LRUCache
+from utils.cache import content_key
+
+# Solved problems keyed by a content hash of (cov, mu, risk_aversion, reps)
+_RESULT_CACHE: LRUCache = LRUCache(maxsize=1024)
+_RESULT_CACHE_LOCK = threading.Lock()
+
+# The classical fallback enumerates every portfolio up to this many assets (2^20 ~ 1M rows),
+# evaluating 64K candidates (~10 MB of float64 bits) at a time
+_EXHAUSTIVE_MAX_ASSETS = 20
+_EXHAUSTIVE_CHUNK = 1 << 16
+
+@lru_cache(maxsize=None)
+def _qiskit():
+    """
+    Resolve the Qiskit symbols once per process.
+    
+    Importing stays deferred to the first solve so app startup does not pay for Qiskit,
+    but later calls reuse the cached result instead of re-running the import statements.
+    
+    Returns:
+        Tuple of (QAOA, optimizers module, QuadraticProgram, MinimumEigenOptimizer),
+        or None if the quantum libraries are unavailable
+    """
+    try:
+        from qiskit_algorithms import optimizers as qk_opt
+        from qiskit_algorithms import QAOA
+        from qiskit_optimization import QuadraticProgram
+        from qiskit_optimization.algorithms import MinimumEigenOptimizer
+    except Exception:
+        return None
+    return QAOA, qk_opt, QuadraticProgram, MinimumEigenOptimizer
+
+# Reusable Qiskit objects, kept per worker thread: QAOA and the programs are mutated while
+# solving, so sharing one instance between concurrent requests would not be safe
+_QISKIT_LOCAL = threading.local()
+
+def _qiskit_objects(n: int, reps: int):
+    """
+    This thread's (QuadraticProgram, MinimumEigenOptimizer) pair for n assets and reps layers.
+    
+    The program's n binary variables and the SPSA/QAOA/MinimumEigenOptimizer stack are built
+    once per (thread, size) instead of per solve; callers only replace the objective.
+    """
+    QAOA, qk_opt, QuadraticProgram, MinimumEigenOptimizer = _qiskit()
+    programs = getattr(_QISKIT_LOCAL, "programs", None)
+    if programs is None:
+        programs = _QISKIT_LOCAL.programs = LRUCache(maxsize=16)
+        _QISKIT_LOCAL.optimizers = LRUCache(maxsize=16)
+    optimizers = _QISKIT_LOCAL.optimizers
+    
+    qp = programs.get(n)
+    if qp is None:
+        # Build QUBO problem in Qiskit format: x_i ∈ {0, 1} for each asset
+        qp = QuadraticProgram()
+        for i in range(n):
+            qp.binary_var(name=f"x{i}")
+        programs[n] = qp
+    
+    meo = optimizers.get(reps)
+    if meo is None:
+        # Configure QAOA with classical optimizer (SPSA = Simultaneous Perturbation Stochastic Approximation)
+        optimizer = qk_opt.SPSA(maxiter=20)  # Reduced iterations for demo speed
+        qaoa = QAOA(optimizer=optimizer, reps=reps)  # Create QAOA solver
+        # Wrap QAOA in MinimumEigenOptimizer for portfolio problem
+        meo = optimizers[reps] = MinimumEigenOptimizer(min_eigen_solver=qaoa)
+    return qp, meo
 
 def portfolio_qubo_objective(bits: np.ndarray, cov: np.ndarray, mu: np.ndarray, risk_aversion: float) -> float:
     """
@@ -18,7 +87,19 @@ def portfolio_qubo_objective(bits: np.ndarray, cov: np.ndarray, mu: np.ndarray,
     Returns:
         Float representing the portfolio objective to minimize (lower is better)
     """
-    return float(bits.T @ cov @ bits - risk_aversion * (mu.T @ bits))
+    # For 0/1 bits, b'Cb is the sum of the selected block of cov and mu'b the sum of the
+    # selected returns, so excluded assets' rows and columns are never touched
+    sel = np.flatnonzero(bits)
+    return float(cov[np.ix_(sel, sel)].sum() - risk_aversion * mu[sel].sum())
+
+def portfolio_qubo_objective_batch(candidates: np.ndarray, cov: np.ndarray, mu: np.ndarray, risk_aversion: float) -> np.ndarray:
+    """
+    Evaluate portfolio_qubo_objective for every row of a (k, n) matrix of candidate bitstrings.
+    
+    Returns:
+        Array of k objective values, computed as one BLAS matmul, a row-wise dot and one matvec
+    """
+    return np.einsum("ij,ij->i", candidates @ cov, candidates) - risk_aversion * (candidates @ mu)
 
 def solve_qaoa(cov: np.ndarray, mu: np.ndarray, risk_aversion: float = 0.5, reps: int = 1) -> Tuple[List[int], float]:
     """
@@ -40,72 +121,101 @@ def solve_qaoa(cov: np.ndarray, mu: np.ndarray, risk_aversion: float = 0.5, reps
         
     Returns:
         Tuple of (binary selection array, objective value)
+        
+    Results are memoized per (cov, mu, risk_aversion, reps), so clients polling
+    with identical parameters skip the circuit simulation entirely.
     """
+    key = content_key(cov, mu, float(risk_aversion), int(reps))
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(key)
+    if cached is None:
+        bits, fval = _solve_qaoa_uncached(cov, mu, risk_aversion, reps)
+        cached = (tuple(bits), fval)
+        with _RESULT_CACHE_LOCK:
+            _RESULT_CACHE[key] = cached
+    return list(cached[0]), cached[1]
+
+def _solve_qaoa_uncached(cov: np.ndarray, mu: np.ndarray, risk_aversion: float, reps: int) -> Tuple[List[int], float]:
+    """Run QAOA (or the classical fallback) without consulting the result cache."""
+    qiskit = _qiskit()
+    if qiskit is None:
+        return _solve_classical_fallback(cov, mu, risk_aversion)
+    
     try:
-        # Import Qiskit modules only when needed (lazy loading for performance)
-        from qiskit_algorithms import optimizers as qk_opt
-        from qiskit_algorithms import QAOA
-        from qiskit_optimization import QuadraticProgram
-        from qiskit_optimization.algorithms import MinimumEigenOptimizer
-        
         # ===== QUANTUM PATH: Try the full QAOA approach =====
         n = len(mu)  # Number of assets
-        
-        # Build QUBO problem in Qiskit format
-        qp = QuadraticProgram()
-        for i in range(n):
-            qp.binary_var(name=f"x{i}")  # x_i ∈ {0, 1} for each asset
+        names = [f"x{i}" for i in range(n)]  # Variable names of the cached program
+        qp, meo = _qiskit_objects(n, reps)
             
         # Set up objective function: minimize risk - lambda * return
-        Q = cov.copy()  # Quadratic coefficients (risk term)
-        c = -risk_aversion * mu  # Linear coefficients (return term, negated for minimization)
-        
-        # Map to Qiskit's optimization problem format
-        linear = {f"x{i}": float(c[i]) for i in range(n)}
-        quadratic = {}
-        for i in range(n):
-            for j in range(i, n):
-                if abs(Q[i, j]) > 1e-12:  # Only include non-zero entries
-                    quadratic[(f"x{i}", f"x{j}")] = float(Q[i, j])
-        qp.minimize(linear=linear, quadratic=quadratic)
-        
-        # Configure QAOA with classical optimizer (SPSA = Simultaneous Perturbation Stochastic Approximation)
-        optimizer = qk_opt.SPSA(maxiter=20)  # Reduced iterations for demo speed
-        qaoa = QAOA(optimizer=optimizer, reps=reps)  # Create QAOA solver
+        Q = np.asarray(cov, dtype=float)  # Quadratic coefficients (risk term)
+        c = -risk_aversion * np.asarray(mu, dtype=float)  # Linear coefficients (return term, negated for minimization)
         
-        # Wrap QAOA in MinimumEigenOptimizer for portfolio problem
-        meo = MinimumEigenOptimizer(min_eigen_solver=qaoa)
+        # Map to Qiskit's optimization problem format: upper triangle of Q, non-zero entries only
+        linear = dict(zip(names, c.tolist()))
+        rows, cols = np.triu_indices(n)
+        vals = Q[rows, cols]
+        keep = np.abs(vals) > 1e-12
+        quadratic = {
+            (names[i], names[j]): v
+            for i, j, v in zip(rows[keep].tolist(), cols[keep].tolist(), vals[keep].tolist())
+        }
+        qp.minimize(linear=linear, quadratic=quadratic)  # Replaces the previous solve's objective
         result = meo.solve(qp)
         
         # Extract binary solution and objective value
-        bits = [int(result.x[i]) for i in range(len(mu))]
+        bits = np.asarray(result.x, dtype=np.int8).tolist()  # One C-level cast; tolist gives Python ints
         return bits, float(result.fval)
         
-    except Exception as e:
-        # ===== CLASSICAL FALLBACK: Quantum libraries unavailable or failed =====
-        # Use a simple heuristic quantum-inspired approach (random sampling)
-        n = len(mu)
-        best_bits = None
-        best_objective = float('inf')
-        
-        # Try random binary combinations (simulates quantum sampling without quantum hardware)
-        np.random.seed(42)  # For reproducibility in demos
-        for _ in range(min(16, 2**n)):  # Limit trials for performance (max 16 samples)
-            bits = np.random.randint(0, 2, size=n)  # Random portfolio selection
-            
-            # Ensure at least one asset is selected (no empty portfolio)
-            if np.sum(bits) == 0:
-                bits[np.argmax(mu)] = 1  # Select highest return asset
-            
-            # Evaluate this portfolio candidate
-            objective = portfolio_qubo_objective(bits, cov, mu, risk_aversion)
-            
-            # Keep track of best solution found
-            if objective < best_objective:
-                best_objective = objective
-                best_bits = bits
-        
-        return best_bits.tolist(), best_objective
+    except Exception:
+        # Quantum backend failed at runtime
+        return _solve_classical_fallback(cov, mu, risk_aversion)
+
+def _solve_classical_fallback(cov: np.ndarray, mu: np.ndarray, risk_aversion: float) -> Tuple[List[int], float]:
+    """Quantum-inspired random sampling used when Qiskit is unavailable or fails."""
+    # ===== CLASSICAL FALLBACK: Quantum libraries unavailable or failed =====
+    n = len(mu)
+    if n <= _EXHAUSTIVE_MAX_ASSETS:
+        # Small universes: checking all 2^n portfolios is cheap and guaranteed optimal
+        return _solve_exhaustive(cov, mu, risk_aversion)
+    
+    # Use a simple heuristic quantum-inspired approach (random sampling)
+    k = min(16, 2**n)  # Limit trials for performance (max 16 samples)
+    
+    # Draw all candidate portfolios at once (simulates quantum sampling without quantum
+    # hardware); a local generator keeps the demo reproducible without touching global state
+    rng = np.random.default_rng(42)
+    candidates = rng.integers(0, 2, size=(k, n)).astype(np.float64)
+    
+    # Ensure at least one asset is selected (no empty portfolio)
+    candidates[candidates.sum(axis=1) == 0, np.argmax(mu)] = 1.0  # Select highest return asset
+    
+    # Evaluate every candidate in one batched pass
+    objectives = portfolio_qubo_objective_batch(candidates, cov, mu, risk_aversion)
+    
+    # Keep the best solution found (first one on ties)
+    best = int(np.argmin(objectives))
+    return candidates[best].astype(int).tolist(), float(objectives[best])
+
+def _solve_exhaustive(cov: np.ndarray, mu: np.ndarray, risk_aversion: float) -> Tuple[List[int], float]:
+    """Minimize the QUBO objective over every non-empty portfolio, in bounded-memory chunks."""
+    n = len(mu)
+    cov = np.asarray(cov, dtype=np.float64)
+    mu = np.asarray(mu, dtype=np.float64)
+    shifts = np.arange(n, dtype=np.uint32)
+    best_code, best_obj = 0, np.inf
+    
+    # Row r of each chunk is the bitstring of integer code r (bit j = asset j); code 0 is the
+    # empty portfolio and is skipped, matching the other paths' at-least-one-asset rule
+    for start in range(1, 1 << n, _EXHAUSTIVE_CHUNK):
+        codes = np.arange(start, min(start + _EXHAUSTIVE_CHUNK, 1 << n), dtype=np.uint32)
+        candidates = ((codes[:, None] >> shifts) & 1).astype(np.float64)
+        objectives = portfolio_qubo_objective_batch(candidates, cov, mu, risk_aversion)
+        i = int(np.argmin(objectives))
+        if objectives[i] < best_obj:
+            best_code, best_obj = int(codes[i]), float(objectives[i])
+    
+    return [(best_code >> j) & 1 for j in range(n)], best_obj
 
 def get_qaoa_state_preview(n_qubits: int = 3):
     """
@@ -129,11 +239,11 @@ def get_qaoa_state_preview(n_qubits: int = 3):
     Returns:
         List of dicts with theta and phi angles for each qubit's Bloch sphere position
     """
-    np.random.seed(42)  # Fixed seed for consistent visualization
+    rng = np.random.default_rng(42)  # Fixed seed for consistent visualization, without touching global state
 
-    # Generate random angles representing quantum superposition states
+    # Generate random angles representing quantum superposition states in one draw:
+    # column 0 is the polar angle θ in [0, π) (|0⟩ to |1⟩), column 1 the azimuthal phase φ in [0, 2π)
     # (In real QAOA, these would come from the quantum circuit's parameterized gates)
-    theta = np.random.uniform(0, np.pi, n_qubits)  # Polar angle: 0 (|0⟩) to π (|1⟩)
-    phi = np.random.uniform(0, 2 * np.pi, n_qubits)  # Azimuthal angle: quantum phase
+    angles = rng.uniform([0.0, 0.0], [np.pi, 2 * np.pi], size=(n_qubits, 2))
     
-    return [{"theta": float(t), "phi": float(p)} for t, p in zip(theta, phi)]
\ No newline at end of file
+    return [{"theta": t, "phi": p} for t, p in angles.tolist()]
\ No newline at end of file
@@ -10,9 +10,15 @@ import uvicorn
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
+    # Production defaults: no reload watcher, worker count from WORKERS (e.g. $(nproc) for the
+    # CPU-bound optimize/FFT endpoints). "auto" picks uvloop/httptools when installed and falls
+    # back to asyncio/h11 elsewhere (uvloop has no Windows build). Set RELOAD=1 for development.
     uvicorn.run(
         "api.main:app",
-        host="127.0.0.1",
-        port=8000,
-        reload=True
+        host=os.getenv("HOST", "127.0.0.1"),
+        port=int(os.getenv("PORT", "8000")),
+        reload=os.getenv("RELOAD", "0") == "1",
+        workers=int(os.getenv("WORKERS", "1")),
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto")
     )
\ No newline at end of file
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Hashable, MutableMapping, Optional
+import numpy as np
+import pandas as pd
+
+def content_key(*parts) -> bytes:
+    """Stable 128-bit BLAKE2b digest of arrays, bytes and scalars for use as a cache key.
+
+    Arrays are hashed by dtype, shape and raw buffer, so two requests with equal
+    numbers map to the same key regardless of how the arrays were built.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            arr = np.ascontiguousarray(part)
+            h.update(arr.dtype.str.encode())
+            h.update(struct.pack(f"<{arr.ndim}q", *arr.shape))
+            h.update(arr.tobytes())
+        elif isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(part)
+        else:
+            h.update(repr(part).encode())
+        h.update(b"\x00")  # Separator so ("ab", "c") and ("a", "bc") differ
+    return h.digest()
+
+def cached_call(cache: MutableMapping, lock: threading.Lock, key: Hashable, compute: Callable[[], Any]) -> Any:
+    """Return cache[key], calling compute() and storing its result on a miss.
+
+    The lock only guards cache access (cachetools caches are not thread-safe), so slow
+    computations for different keys still run concurrently. None results are not cached,
+    letting failed lookups be retried on the next call.
+    """
+    with lock:
+        value = cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            with lock:
+                cache[key] = value
+    return value
+
+def parquet_cache_path(cache_dir: Path, *key_parts) -> Path:
+    """File for a Parquet cache entry; the name is a content_key hash, so arbitrary ticker
+    strings can't escape the cache directory."""
+    return cache_dir / f"{content_key(*key_parts).hex()}.parquet"
+
+def read_fresh_parquet(path: Path, ttl: float) -> Optional[pd.DataFrame]:
+    """The frame stored at path if it was written less than ttl seconds ago, else None."""
+    try:
+        if time.time() - path.stat().st_mtime < ttl:
+            return pd.read_parquet(path)
+    except (OSError, ValueError):
+        pass  # Missing, stale or unreadable file - caller refetches
+    return None
+
+def write_parquet_atomic(df: pd.DataFrame, path: Path) -> None:
+    """Write df to path via a per-thread temp file and os.replace, so concurrent readers in
+    other workers never see a partial file. Raises OSError/ValueError on failure."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
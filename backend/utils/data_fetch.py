@@ -1,10 +1,15 @@
+import numpy as np
 import pandas as pd
 import yfinance as yf
 from typing import List
 
 def fetch_prices(tickers: List[str], start: str = "2018-01-01", end: str = None) -> pd.DataFrame:
-    data = yf.download(tickers, start=start, end=end, auto_adjust=True, progress=False)["Close"]
+    # One threaded batch download (tickers fetched in parallel), closes returned as float32:
+    # ample precision for prices at half the memory traffic downstream
+    data = yf.download(tickers, start=start, end=end, auto_adjust=True, progress=False,
+                       threads=True, group_by="column")["Close"]
     if isinstance(data, pd.Series):
         data = data.to_frame()
-    data = data.dropna(how="all").fillna(method="ffill").dropna()
+    data = data.astype(np.float32)
+    data = data.dropna(how="all").ffill().dropna()
     return data
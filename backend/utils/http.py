@@ -0,0 +1,13 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+def make_session(pool_size: int = 64) -> requests.Session:
+    """Create a requests.Session with a connection pool large enough for concurrent handlers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Process-wide keep-alive session so repeat requests to the same host skip the TCP/TLS handshake
+SESSION = make_session()